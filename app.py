@@ -1,28 +1,70 @@
 # app.py
 import os
-from typing import Dict, Any
+import asyncio
+import logging
+import logging.handlers
+import queue
+from contextlib import asynccontextmanager
+from typing import Tuple
 from dotenv import load_dotenv
 
 from fastapi import FastAPI
 from fastapi.templating import Jinja2Templates
 
+import calendar_event
 import chat
 import voice
 import oauth_google
+import session_store
 
 load_dotenv(override=True)
 
 
-app = FastAPI(title="Voice Scheduling Agent")
+def _start_logging() -> Tuple[logging.handlers.QueueListener, logging.Handler]:
+    """
+    Request handlers only enqueue log records; a listener thread does the
+    formatting and stderr writes, so logging never blocks the event loop.
+    """
+    q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    sink = logging.StreamHandler()
+    sink.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    handler = logging.handlers.QueueHandler(q)
+    root = logging.getLogger()
+    root.addHandler(handler)
+    level = os.getenv("LOG_LEVEL", "WARNING").upper()
+    if not isinstance(logging.getLevelName(level), int):
+        root.warning("Unknown LOG_LEVEL %r, using WARNING", level)
+        level = "WARNING"
+    root.setLevel(level)
+    listener = logging.handlers.QueueListener(q, sink, respect_handler_level=True)
+    listener.start()
+    return listener, handler
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    listener, handler = _start_logging()
+    try:
+        # warm outbound connection pools before taking traffic
+        await asyncio.gather(chat.startup(), voice.startup())
+        yield
+        await calendar_event.aclose()
+    finally:
+        listener.stop()
+        # a later lifespan (e.g. another TestClient) must not stack a second handler
+        logging.getLogger().removeHandler(handler)
+
+
+app = FastAPI(title="Voice Scheduling Agent", lifespan=lifespan)
 
 templates = Jinja2Templates(directory="templates")
 
-# demo: in-memory sessions (use Redis in prod)
-SESSIONS: Dict[str, Dict[str, Any]] = {}
+# in-memory sessions by default; set REDIS_URL to share them across workers
+STORE = session_store.from_env()
 
-chat.init(templates=templates, sessions=SESSIONS)
-voice.init(templates=templates, sessions=SESSIONS)
-oauth_google.init(sessions=SESSIONS)
+chat.init(templates=templates, store=STORE)
+voice.init(templates=templates, store=STORE)
+oauth_google.init(store=STORE)
 
 app.include_router(oauth_google.router)
 app.include_router(chat.router)
@@ -1,6 +1,8 @@
 # calendar_event.py
 from __future__ import annotations
 
+import asyncio
+import atexit
 import os
 import time
 import uuid
@@ -13,11 +15,42 @@ import httpx
 GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
 GOOGLE_CAL_API = "https://www.googleapis.com/calendar/v3"
 
+# shared keep-alive pool: avoids a fresh TCP+TLS handshake to Google per booking
+_HTTP = httpx.Client(
+    timeout=25,
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=8),
+)
+atexit.register(_HTTP.close)
+# async twin used on the booking path, so event creation never ties up a worker thread;
+# closed from the app lifespan via aclose()
+_AHTTP = httpx.AsyncClient(
+    timeout=25,
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=8),
+)
+
 
 class GoogleAuthError(RuntimeError):
     pass
 
 
+async def prewarm_google() -> None:
+    """
+    Open keep-alive connections to the token and Calendar hosts ahead of the
+    first booking. Best-effort: any network error is ignored.
+    """
+    await asyncio.gather(
+        asyncio.to_thread(_HTTP.head, GOOGLE_TOKEN_URL, timeout=5),
+        _AHTTP.head(GOOGLE_CAL_API, timeout=5),
+        return_exceptions=True,
+    )
+
+
+async def aclose() -> None:
+    await _AHTTP.aclose()
+
+
 def refresh_access_token(*, refresh_token: str) -> Dict[str, Any]:
     """
     Refresh OAuth access token using refresh_token.
@@ -35,14 +68,57 @@ def refresh_access_token(*, refresh_token: str) -> Dict[str, Any]:
         "grant_type": "refresh_token",
     }
 
-    with httpx.Client(timeout=20) as client:
-        r = client.post(GOOGLE_TOKEN_URL, data=data)
-        if r.status_code != 200:
-            raise GoogleAuthError(f"Failed to refresh token: {r.status_code} {r.text}")
+    r = _HTTP.post(GOOGLE_TOKEN_URL, data=data, timeout=20)
+    if r.status_code != 200:
+        raise GoogleAuthError(f"Failed to refresh token: {r.status_code} {r.text}")
+
+    js = r.json()
+    # js contains: access_token, expires_in, scope, token_type
+    return js
+
 
-        js = r.json()
-        # js contains: access_token, expires_in, scope, token_type
-        return js
+def _event_request(
+    *,
+    calendar_id: str,
+    title: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    tz_name: str,
+    attendee_email: str,
+    description: str,
+    location: str,
+    request_id: Optional[str],
+) -> Dict[str, Any]:
+    """
+    Build the events.insert request (as httpx.post kwargs) with a Google Meet
+    link (conferenceData). Google emails the invite to attendee_email.
+    """
+    body = {
+        "summary": title,
+        "description": description,
+        "location": location,
+        "start": {"dateTime": start_dt.isoformat(), "timeZone": tz_name},
+        "end": {"dateTime": end_dt.isoformat(), "timeZone": tz_name},
+        "attendees": [{"email": attendee_email}],
+        # Important: conferenceData requires conferenceDataVersion=1 in query
+        "conferenceData": {
+            "createRequest": {
+                "requestId": request_id or uuid.uuid4().hex,
+                "conferenceSolutionKey": {"type": "hangoutsMeet"},
+            }
+        },
+    }
+    return {
+        "url": f"{GOOGLE_CAL_API}/calendars/{calendar_id}/events",
+        "params": {"conferenceDataVersion": 1, "sendUpdates": "all"},
+        "json": body,
+    }
+
+
+def _created_event(resp: httpx.Response) -> Dict[str, Any]:
+    if resp.status_code not in (200, 201):
+        raise RuntimeError(f"Create event failed: {resp.status_code} {resp.text}")
+    return resp.json()
 
 
 def create_google_calendar_event(
@@ -62,42 +138,31 @@ def create_google_calendar_event(
     Create a Google Calendar event with Google Meet link (conferenceData).
     Add attendee_email -> Google will send invite email automatically.
     """
+    req = _event_request(
+        calendar_id=calendar_id, title=title, start_dt=start_dt, end_dt=end_dt, tz_name=tz_name,
+        attendee_email=attendee_email, description=description, location=location, request_id=request_id,
+    )
+    return _created_event(_HTTP.post(headers={"Authorization": f"Bearer {access_token}"}, **req))
 
-    if not request_id:
-        request_id = uuid.uuid4().hex
-
-    def _do_create(token: str) -> httpx.Response:
-        url = f"{GOOGLE_CAL_API}/calendars/{calendar_id}/events"
-        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-
-        body = {
-            "summary": title,
-            "description": description,
-            "location": location,
-            "start": {"dateTime": start_dt.isoformat(), "timeZone": tz_name},
-            "end": {"dateTime": end_dt.isoformat(), "timeZone": tz_name},
-            "attendees": [{"email": attendee_email}],
-            # Important: conferenceData requires conferenceDataVersion=1 in query
-            "conferenceData": {
-                "createRequest": {
-                    "requestId": request_id,
-                    "conferenceSolutionKey": {"type": "hangoutsMeet"},
-                }
-            },
-        }
-
-        with httpx.Client(timeout=25) as client:
-            return client.post(
-                url,
-                headers=headers,
-                params={"conferenceDataVersion": 1, "sendUpdates": "all"},
-                json=body,
-            )
-
-    resp = _do_create(access_token)
 
-
-    if resp.status_code not in (200, 201):
-        raise RuntimeError(f"Create event failed: {resp.status_code} {resp.text}")
-
-    return resp.json()
\ No newline at end of file
+async def acreate_google_calendar_event(
+    *,
+    access_token: str,
+    calendar_id: str,
+    title: str,
+    start_dt: datetime,
+    end_dt: datetime,
+    tz_name: str,
+    attendee_email: str,
+    description: str = "",
+    location: str = "",
+    request_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Async variant of create_google_calendar_event (shared httpx.AsyncClient pool).
+    """
+    req = _event_request(
+        calendar_id=calendar_id, title=title, start_dt=start_dt, end_dt=end_dt, tz_name=tz_name,
+        attendee_email=attendee_email, description=description, location=location, request_id=request_id,
+    )
+    return _created_event(await _AHTTP.post(headers={"Authorization": f"Bearer {access_token}"}, **req))
@@ -2,53 +2,76 @@
 from __future__ import annotations
 
 import os
-import json
-from dataclasses import dataclass, asdict
+import logging
+import re
+import asyncio
+import secrets
+from dataclasses import dataclass
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 
+import orjson
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI
 
-from calendar_event import create_google_calendar_event
+from agent_state import is_valid_email, is_valid_phone, normalize_phone, parse_yes_no
+from calendar_event import acreate_google_calendar_event
+from oauth_google import get_valid_access_token
+from session_store import SessionStore
 
 load_dotenv(override=True)
 
+log = logging.getLogger(__name__)
+
 router = APIRouter()
 _templates: Optional[Jinja2Templates] = None
-_sessions: Dict[str, Dict[str, Any]] = {}
+_store: SessionStore = SessionStore()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 TZ_NAME = os.getenv("TZ_NAME", "America/Los_Angeles")
 CALENDAR_ID = os.getenv("CALENDAR_ID", "primary")
 DEFAULT_DURATION_MIN = int(os.getenv("MEETING_DURATION_MIN", "30"))
 DEFAULT_TITLE = os.getenv("DEFAULT_TITLE", "Scheduled Meeting")
 CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4.1-nano")
+LLM_TIMEOUT_SEC = float(os.getenv("LLM_TIMEOUT_SEC", "45"))
+CALENDAR_TIMEOUT_SEC = float(os.getenv("CALENDAR_TIMEOUT_SEC", "45"))
+SSE_KEEPALIVE_SEC = 15
 
 
-def init(*, templates: Jinja2Templates, sessions: Dict[str, Dict[str, Any]]):
-    global _templates, _sessions
+def init(*, templates: Jinja2Templates, store: SessionStore):
+    global _templates, _store
     _templates = templates
-    _sessions = sessions
+    _store = store
+
+
+async def startup() -> None:
+    """
+    Called once from the app lifespan: open this module's OpenAI connection
+    pool so the first chat turn does not pay DNS + TLS setup.
+    """
+    try:
+        await client.with_options(timeout=5, max_retries=0).models.list()
+    except Exception as e:
+        log.warning("OpenAI pre-warm failed: %r", e)
+
+
+# strong refs to in-flight bookings, which outlive the request if the client disconnects
+_booking_tasks: "set[asyncio.Task]" = set()
 
 
 def _get_sid(req: Request) -> str:
-    sid = req.cookies.get("sid")
-    if not sid:
-        import uuid
-        sid = str(uuid.uuid4())
-    return sid
+    return req.cookies.get("sid") or secrets.token_urlsafe(16)
 
 
-def _get_tokens(sid: str) -> Optional[Dict[str, str]]:
-    return _sessions.get(sid, {}).get("google_tokens")
+async def _get_tokens(sid: str) -> Optional[Dict[str, str]]:
+    return await _store.get(sid, "google_tokens")
 
 
-@dataclass
+@dataclass(slots=True)
 class BookingState:
     step: str = "ask_email_phone"  # ask_email_phone -> confirm_contact -> ask_time -> ask_title -> confirm_all -> done
     email: Optional[str] = None
@@ -57,41 +80,47 @@ class BookingState:
     title: Optional[str] = None
 
 
-def _load_state(sid: str) -> BookingState:
-    raw = _sessions.setdefault(sid, {}).get("booking_state")
+def _state_to_dict(st: BookingState) -> Dict[str, Any]:
+    # flat dataclass: a literal is much cheaper than asdict()'s recursive copy
+    return {
+        "step": st.step,
+        "email": st.email,
+        "phone": st.phone,
+        "start_iso": st.start_iso,
+        "title": st.title,
+    }
+
+
+async def _load_state(sid: str) -> BookingState:
+    raw = await _store.get(sid, "booking_state")
     if not raw:
         st = BookingState()
-        _sessions[sid]["booking_state"] = asdict(st)
+        await _store.set(sid, "booking_state", _state_to_dict(st))
         return st
     return BookingState(**raw)
 
 
-def _save_state(sid: str, st: BookingState):
-    _sessions.setdefault(sid, {})["booking_state"] = asdict(st)
+async def _save_state(sid: str, st: BookingState):
+    await _store.set(sid, "booking_state", _state_to_dict(st))
 
 
 def _is_yes(text: str) -> bool:
-    t = (text or "").strip().lower()
-    return t in {"yes", "y", "yeah", "yep", "confirm", "ok", "okay", "sure"}
+    return parse_yes_no(text) is True
 
 
 def _is_no(text: str) -> bool:
-    t = (text or "").strip().lower()
-    return t in {"no", "n", "nope", "cancel", "restart"}
+    return parse_yes_no(text) is False
 
 
 def _parse_iso_datetime(s: str) -> Optional[datetime]:
     """
     Parse ISO-8601 string produced by LLM.
-    Accepts trailing 'Z' by converting to +00:00.
+    fromisoformat accepts a trailing 'Z' natively on Python 3.11+.
     """
     if not s:
         return None
     try:
-        s2 = s.strip()
-        if s2.endswith("Z"):
-            s2 = s2[:-1] + "+00:00"
-        return datetime.fromisoformat(s2)
+        return datetime.fromisoformat(s.strip())
     except Exception:
         return None
 
@@ -137,102 +166,114 @@ Return JSON:
 """
 
 
-def llm_extract_and_validate(user_text: str, state: BookingState) -> Dict[str, Any]:
-    schema = {
-        "type": "object",
-        "additionalProperties": False,
-        "properties": {
-            "extracted": {
-                "type": "object",
-                "additionalProperties": False,
-                "properties": {
-                    "email": {"type": ["string", "null"]},
-                    "email_ok": {"type": "boolean"},
-                    "phone": {"type": ["string", "null"]},
-                    "phone_ok": {"type": "boolean"},
-                    "start_iso": {"type": ["string", "null"]},
-                    "start_ok": {"type": "boolean"},
-                    "title": {"type": ["string", "null"]},
-                    "confirm": {"type": ["string", "null"], "enum": ["yes", "no", None]},
-                },
-                "required": ["email", "email_ok", "phone", "phone_ok", "start_iso", "start_ok", "title", "confirm"],
+# built once: the schema and system message are identical for every request
+_PLANNER_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {
+        "extracted": {
+            "type": "object",
+            "additionalProperties": False,
+            "properties": {
+                "email": {"type": ["string", "null"]},
+                "email_ok": {"type": "boolean"},
+                "phone": {"type": ["string", "null"]},
+                "phone_ok": {"type": "boolean"},
+                "start_iso": {"type": ["string", "null"]},
+                "start_ok": {"type": "boolean"},
+                "title": {"type": ["string", "null"]},
+                "confirm": {"type": ["string", "null"], "enum": ["yes", "no", None]},
             },
-            "notes": {
-                "type": "object",
-                "additionalProperties": False,
-                "properties": {
-                    "email_reason": {"type": ["string", "null"]},
-                    "phone_reason": {"type": ["string", "null"]},
-                    "time_reason": {"type": ["string", "null"]},
-                },
-                "required": ["email_reason", "phone_reason", "time_reason"],
+            "required": ["email", "email_ok", "phone", "phone_ok", "start_iso", "start_ok", "title", "confirm"],
+        },
+        "notes": {
+            "type": "object",
+            "additionalProperties": False,
+            "properties": {
+                "email_reason": {"type": ["string", "null"]},
+                "phone_reason": {"type": ["string", "null"]},
+                "time_reason": {"type": ["string", "null"]},
             },
+            "required": ["email_reason", "phone_reason", "time_reason"],
         },
-        "required": ["extracted", "notes"],
+    },
+    "required": ["extracted", "notes"],
+}
+
+_PLANNER_TEXT_FORMAT: Dict[str, Any] = {
+    "format": {
+        "type": "json_schema",
+        "name": "planner",
+        "schema": _PLANNER_SCHEMA,
+        "strict": True,
     }
+}
 
-    r = client.responses.create(
+# kept first in `input` so the shared prefix is eligible for OpenAI prompt caching
+_PLANNER_SYSTEM_MSG = {"role": "system", "content": PLANNER_SYSTEM}
+
+
+async def llm_extract_and_validate(user_text: str, state: BookingState) -> Dict[str, Any]:
+    r = await client.responses.create(
         model=CHAT_MODEL,
         input=[
-            {"role": "system", "content": PLANNER_SYSTEM},
-            {"role": "user", "content": f"STATE={json.dumps(asdict(state))}\nUSER={user_text}"},
+            _PLANNER_SYSTEM_MSG,
+            {"role": "user", "content": f"STATE={orjson.dumps(state).decode()}\nUSER={user_text}"},
         ],
-        text={
-            "format": {
-                "type": "json_schema",
-                "name": "planner",
-                "schema": schema,
-                "strict": True,
-            }
-        },
+        text=_PLANNER_TEXT_FORMAT,
     )
     try:
-        return json.loads(r.output_text)
+        return orjson.loads(r.output_text)
     except Exception:
         # safe fallback
-        return {
-            "extracted": {
-                "email": None, "email_ok": False,
-                "phone": None, "phone_ok": False,
-                "start_iso": None, "start_ok": False,
-                "title": None,
-                "confirm": None
-            },
-            "notes": {"email_reason": "parse_error", "phone_reason": "parse_error", "time_reason": "parse_error"}
-        }
+        return _empty_plan("parse_error")
 
 
-# -------------------------
-# LLM speaker (stream)
-# -------------------------
-def llm_stream_reply(user_text: str, state: BookingState, planned_assistant_text: str):
-    system = f"""
-You are a scheduling assistant.
-Be concise and helpful.
-
-Current step: {state.step}
-Known info:
-- email: {state.email}
-- phone: {state.phone}
-- start_iso: {state.start_iso}
-- title: {state.title}
-
-You must follow the planned assistant message exactly in meaning.
-Do NOT mention internal JSON or planning.
-"""
+def _empty_plan(reason: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "extracted": {
+            "email": None, "email_ok": False,
+            "phone": None, "phone_ok": False,
+            "start_iso": None, "start_ok": False,
+            "title": None,
+            "confirm": None
+        },
+        "notes": {"email_reason": reason, "phone_reason": reason, "time_reason": reason}
+    }
 
-    with client.responses.stream(
-        model=CHAT_MODEL,
-        input=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": f"User said: {user_text}\n\nPlanned assistant message:\n{planned_assistant_text}"},
-        ],
-    ) as stream:
-        for event in stream:
-            if event.type == "response.output_text.delta":
-                chunk = event.delta or ""
-                if chunk:
-                    yield chunk
+
+_CONTACT_SPLIT_RE = re.compile(r"[,;\n]|\s+and\s+")
+
+
+def fast_extract(user_text: str, step: str) -> Optional[Dict[str, Any]]:
+    """
+    Regex-only planner for trivial replies (yes/no, "email, +phone").
+    Returns a plan shaped like llm_extract_and_validate's, or None when
+    the LLM is needed (e.g. natural-language dates).
+    """
+    if step in ("confirm_contact", "confirm_all"):
+        yn = parse_yes_no(user_text)
+        if yn is None:
+            return None
+        plan = _empty_plan()
+        plan["extracted"]["confirm"] = "yes" if yn else "no"
+        return plan
+
+    if step == "ask_email_phone":
+        email = phone = None
+        for tok in _CONTACT_SPLIT_RE.split(user_text):
+            tok = tok.strip().rstrip(".!")
+            if not email and is_valid_email(tok):
+                email = tok.lower()
+            # only already-international numbers; local formats still go through the LLM for E.164
+            elif not phone and tok.startswith("+") and is_valid_phone(tok):
+                phone = normalize_phone(tok)
+        if email and phone:
+            plan = _empty_plan()
+            plan["extracted"].update(email=email, email_ok=True, phone=phone, phone_ok=True)
+            return plan
+
+    return None
 
 
 def _contact_summary(st: BookingState) -> str:
@@ -248,6 +289,25 @@ def _final_summary(st: BookingState) -> str:
     )
 
 
+# -------------------------
+# SSE frames (bytes; orjson encodes straight to UTF-8)
+# -------------------------
+_DELTA_PREFIX = b'data: {"type":"delta","text":'
+_SUFFIX = b"}\n\n"
+_DONE_FRAME = b'data: {"type":"done"}\n\n'
+_KEEPALIVE_FRAME = b": keepalive\n\n"  # SSE comment; ignored by the client
+
+
+def _delta_frame(text: str) -> bytes:
+    return _DELTA_PREFIX + orjson.dumps(text) + _SUFFIX
+
+
+_OAUTH_WARN_FRAME = _delta_frame(
+    "⚠️ Google Calendar is not connected yet. Please complete OAuth login first: /auth/google"
+) + _DONE_FRAME
+_CREATE_FAILED_FRAME = _delta_frame("\n\n⚠️ Failed to create event. Please try again in a moment.")
+
+
 @router.get("/chat", response_class=HTMLResponse)
 def chat_page(request: Request):
     assert _templates is not None
@@ -261,18 +321,20 @@ async def chat_stream(request: Request):
     user_text = (messages[-1]["content"] if messages else "").strip()
 
     sid = _get_sid(request)
-    st = _load_state(sid)
+    st = await _load_state(sid)
+    st_before = _state_to_dict(st)
 
-    tokens = _get_tokens(sid)
+    tokens = await _get_tokens(sid)
     if not tokens:
-        def one():
-            msg = "⚠️ Google Calendar is not connected yet. Please complete OAuth login first: /auth/google"
-            yield f"data: {json.dumps({'type':'delta','text':msg})}\n\n"
-            yield f"data: {json.dumps({'type':'done'})}\n\n"
-        return StreamingResponse(one(), media_type="text/event-stream")
-
-    # LLM extract+validate
-    plan = llm_extract_and_validate(user_text, st)
+        return Response(_OAUTH_WARN_FRAME, media_type="text/event-stream")
+
+    # regex fast path first; LLM extract+validate only when it can't decide
+    plan = fast_extract(user_text, st.step)
+    if plan is None:
+        try:
+            plan = await asyncio.wait_for(llm_extract_and_validate(user_text, st), LLM_TIMEOUT_SEC)
+        except asyncio.TimeoutError:
+            plan = _empty_plan("timeout")
     ex = plan.get("extracted") or {}
     notes = plan.get("notes") or {}
 
@@ -358,28 +420,33 @@ async def chat_stream(request: Request):
     elif st.step == "done":
         planned_text = "Your event is already created. Click Clear to start a new booking."
 
-    _save_state(sid, st)
+    # most unparseable replies leave the state untouched; skip the write then
+    if _state_to_dict(st) != st_before:
+        await _save_state(sid, st)
 
     # -------------------------
     # SSE stream
     # -------------------------
-    def sse():
-        # A) stream the assistant reply
-        for chunk in llm_stream_reply(user_text, st, planned_text):
-            yield f"data: {json.dumps({'type':'delta','text':chunk})}\n\n"
+    async def sse():
+        # A) send the planned reply directly: the planner call is the only LLM
+        #    round-trip per turn (no second "speaker" pass to rephrase it)
+        yield _delta_frame(planned_text)
 
         # B) after streaming, if user confirmed in confirm_all -> create event
-        st2 = _load_state(sid)
+        st2 = await _load_state(sid)
         if st2.step == "confirm_all" and (confirm == "yes") and st2.start_iso and st2.email and st2.phone:
-            try:
-                start_dt = _parse_iso_datetime(st2.start_iso)
-                if start_dt is None:
-                    yield f"data: {json.dumps({'type':'delta','text':'\\n\\n⚠️ Internal error: invalid start_iso format.'})}\n\n"
-                else:
-                    end_dt = start_dt + timedelta(minutes=DEFAULT_DURATION_MIN)
-
-                    created = create_google_calendar_event(
-                        access_token=tokens["access_token"],
+            start_dt = _parse_iso_datetime(st2.start_iso)
+            if start_dt is None:
+                err = "\n\n⚠️ Internal error: invalid start_iso format."
+                yield _delta_frame(err)
+            else:
+                end_dt = start_dt + timedelta(minutes=DEFAULT_DURATION_MIN)
+
+                async def _create_event() -> Dict[str, Any]:
+                    access_token = await get_valid_access_token(sid)
+                    # async client: wait_for's timeout actually cancels the request
+                    created = await acreate_google_calendar_event(
+                        access_token=access_token,
                         calendar_id=CALENDAR_ID,
                         title=st2.title or DEFAULT_TITLE,
                         start_dt=start_dt,
@@ -388,25 +455,42 @@ async def chat_stream(request: Request):
                         attendee_email=st2.email,  # invite email will be sent by Google Calendar
                         description=f"Phone: {st2.phone}",
                     )
+                    # saved inside the task so a client disconnect can't lose a created event
+                    st2.step = "done"
+                    await _save_state(sid, st2)
+                    return created
+
+                async def _book_logged() -> bytes:
+                    try:
+                        created = await asyncio.wait_for(_create_event(), CALENDAR_TIMEOUT_SEC)
+                    except Exception:
+                        # details go to the log only; the client gets a generic message
+                        log.exception("calendar create failed sid=%s", sid)
+                        return _CREATE_FAILED_FRAME
 
                     html_link = created.get("htmlLink")
                     meet_link = created.get("hangoutLink")
 
-                    st2.step = "done"
-                    _save_state(sid, st2)
-
-                    extra = "\n\n✅ Event created!\n"
+                    parts = ["\n\n✅ Event created!\n"]
                     if meet_link:
-                        extra += f"Meet link: {meet_link}\n"
+                        parts.append(f"Meet link: {meet_link}\n")
                     if html_link:
-                        extra += f"Calendar link: {html_link}\n"
-                    extra += f"Invite email sent to: {st2.email}"
-
-                    yield f"data: {json.dumps({'type':'delta','text':extra})}\n\n"
-
-            except Exception as e:
-                yield f"data: {json.dumps({'type':'delta','text':f'\\n\\n⚠️ Failed to create event: {e}'})}\n\n"
-
-        yield f"data: {json.dumps({'type':'done'})}\n\n"
+                        parts.append(f"Calendar link: {html_link}\n")
+                    parts.append(f"Invite email sent to: {st2.email}")
+                    return _delta_frame("".join(parts))
+
+                task = asyncio.create_task(_book_logged())
+                _booking_tasks.add(task)
+                task.add_done_callback(_booking_tasks.discard)
+                while not task.done():
+                    # asyncio.wait never cancels the task, even when this generator is cancelled
+                    done, _ = await asyncio.wait({task}, timeout=SSE_KEEPALIVE_SEC)
+                    if not done:
+                        if await request.is_disconnected():
+                            return  # task still finishes and records the booking
+                        yield _KEEPALIVE_FRAME
+                yield task.result()
+
+        yield _DONE_FRAME
 
     return StreamingResponse(sse(), media_type="text/event-stream")
\ No newline at end of file
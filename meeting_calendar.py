@@ -4,9 +4,22 @@ from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 import uuid
 
-from googleapiclient.discovery import build
+from googleapiclient.discovery import Resource, build
 from google.oauth2.credentials import Credentials
 
+# build() is expensive (discovery doc + Resource construction); reuse per access token
+_SERVICES: Dict[str, Resource] = {}
+_MAX_SERVICES = 256
+
+def _get_service(creds: Credentials) -> Resource:
+    service = _SERVICES.get(creds.token)
+    if service is None:
+        service = build("calendar", "v3", credentials=creds, static_discovery=True, cache_discovery=False)
+        if len(_SERVICES) >= _MAX_SERVICES:
+            _SERVICES.pop(next(iter(_SERVICES)))
+        _SERVICES[creds.token] = service
+    return service
+
 def create_google_meet_event(
     creds: Credentials,
     calendar_id: str,
@@ -15,7 +28,7 @@ def create_google_meet_event(
     duration_min: int,
     attendee_email: Optional[str] = None,
 ) -> Dict[str, Any]:
-    service = build("calendar", "v3", credentials=creds)
+    service = _get_service(creds)
 
     end_dt = start_dt + timedelta(minutes=duration_min)
 
@@ -1,27 +1,56 @@
 # oauth_google.py
 from __future__ import annotations
 import os
+import asyncio
+import hashlib
+import hmac
 import secrets
-from typing import Dict, Any
+import time
+from datetime import timezone
+from typing import Optional
 
 from fastapi import APIRouter, Request
 from fastapi.responses import RedirectResponse, HTMLResponse
 from google_auth_oauthlib.flow import Flow
 
+from calendar_event import refresh_access_token
+from session_store import SessionStore
+
 router = APIRouter()
 
-_sessions: Dict[str, Dict[str, Any]] = {}
+_store: SessionStore = SessionStore()
+
+# refresh a little before Google's expiry so a token never dies mid-request
+_EXPIRY_SKEW_SEC = 60
+_STATE_MAX_AGE_SEC = 600
 
-def init(sessions: Dict[str, Dict[str, Any]]):
-    global _sessions
-    _sessions = sessions
+def init(store: SessionStore):
+    global _store
+    _store = store
 
 def _get_sid(req: Request) -> str:
-    sid = req.cookies.get("sid")
-    if not sid:
-        import uuid
-        sid = str(uuid.uuid4())
-    return sid
+    return req.cookies.get("sid") or secrets.token_urlsafe(16)
+
+def _state_mac(sid: str, issued: str) -> str:
+    # falls back to the OAuth client secret so no extra config is required
+    secret = os.getenv("OAUTH_STATE_SECRET") or os.getenv("GOOGLE_CLIENT_SECRET")
+    if not secret:
+        raise RuntimeError("Missing OAUTH_STATE_SECRET / GOOGLE_CLIENT_SECRET in .env")
+    return hmac.new(secret.encode(), f"{sid}.{issued}".encode(), hashlib.sha256).hexdigest()
+
+def _make_state(sid: str) -> str:
+    """
+    Stateless CSRF token: `<issued>.<hmac(sid, issued)>`.
+    Nothing is stored server-side, so the callback can land on any worker.
+    """
+    issued = str(int(time.time()))
+    return f"{issued}.{_state_mac(sid, issued)}"
+
+def _check_state(sid: str, state: str) -> bool:
+    issued, _, mac = (state or "").partition(".")
+    if not issued.isdigit() or time.time() - int(issued) > _STATE_MAX_AGE_SEC:
+        return False
+    return hmac.compare_digest(_state_mac(sid, issued), mac)
 
 def _build_flow(state: str) -> Flow:
     """
@@ -51,14 +80,10 @@ def _build_flow(state: str) -> Flow:
     return flow
 
 @router.get("/auth/google")
-def auth_google(request: Request):
+async def auth_google(request: Request):
     sid = _get_sid(request)
 
-    csrf = secrets.token_urlsafe(24)
-    _sessions.setdefault(sid, {})
-    _sessions[sid]["oauth_csrf"] = csrf
-
-    flow = _build_flow(state=csrf)
+    flow = _build_flow(state=_make_state(sid))
     auth_url, _ = flow.authorization_url(
         access_type="offline",           # to receive refresh_token
         include_granted_scopes="true",
@@ -70,21 +95,25 @@ def auth_google(request: Request):
     return resp
 
 @router.get("/google/callback")
-def auth_callback(request: Request, state: str, code: str):
+async def auth_callback(request: Request, state: str, code: str):
     sid = _get_sid(request)
-    saved = _sessions.get(sid, {}).get("oauth_csrf")
-    if not saved or saved != state:
+    if not _check_state(sid, state):
         return HTMLResponse("OAuth state mismatch. Please retry /auth/google", status_code=400)
 
     flow = _build_flow(state=state)
-    flow.fetch_token(code=code)
+    # token exchange is a blocking HTTPS call
+    await asyncio.to_thread(flow.fetch_token, code=code)
 
     creds = flow.credentials
-    _sessions.setdefault(sid, {})
-    _sessions[sid]["google_tokens"] = {
+    expires_at = None
+    if creds.expiry is not None:
+        # google-auth keeps expiry as naive UTC
+        expires_at = creds.expiry.replace(tzinfo=timezone.utc).timestamp() - _EXPIRY_SKEW_SEC
+    await _store.set(sid, "google_tokens", {
         "access_token": creds.token,
         "refresh_token": creds.refresh_token,   # may be None if Google didn't return it
-    }
+        "expires_at": expires_at,
+    })
 
     # simple success page
     html = """
@@ -95,4 +124,26 @@ def auth_callback(request: Request, state: str, code: str):
     """
     resp = HTMLResponse(html)
     resp.set_cookie("sid", sid, httponly=True, samesite="lax")
-    return resp
\ No newline at end of file
+    return resp
+
+async def get_valid_access_token(sid: str) -> Optional[str]:
+    """
+    Return the session's cached access token, refreshing it only once it
+    is about to expire (and a refresh_token is available).
+    """
+    tokens = await _store.get(sid, "google_tokens")
+    if not tokens:
+        return None
+
+    expires_at = tokens.get("expires_at")
+    if expires_at is None or time.time() < expires_at or not tokens.get("refresh_token"):
+        return tokens["access_token"]
+
+    js = await asyncio.to_thread(refresh_access_token, refresh_token=tokens["refresh_token"])
+    tokens = {
+        **tokens,
+        "access_token": js["access_token"],
+        "expires_at": time.time() + int(js.get("expires_in", 3600)) - _EXPIRY_SKEW_SEC,
+    }
+    await _store.set(sid, "google_tokens", tokens)
+    return tokens["access_token"]
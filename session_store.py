@@ -0,0 +1,76 @@
+# session_store.py
+from __future__ import annotations
+
+import os
+from typing import Any, Optional
+
+import orjson
+from cachetools import TLRUCache
+
+SESSION_TTL_SEC = int(os.getenv("SESSION_TTL_SEC", str(24 * 3600)))
+SESSION_MAX_KEYS = int(os.getenv("SESSION_MAX_KEYS", "50000"))
+
+
+class SessionStore:
+    """
+    In-memory per-session key/value store (dev / single worker).
+    Every value expires `ttl` seconds after its last write; `get` does not
+    extend it (e.g. `google_tokens` expire SESSION_TTL_SEC after the OAuth
+    login even for an active user). The store holds at most
+    SESSION_MAX_KEYS entries; when full, expired entries are dropped first,
+    then the least recently used one.
+    Callers must `set` a value again after mutating it; other backends
+    do not share object references.
+    """
+
+    def __init__(self, maxsize: int = SESSION_MAX_KEYS) -> None:
+        # values are stored as (value, ttl); the cache derives each expiry from ttl
+        self._data: TLRUCache = TLRUCache(maxsize=maxsize, ttu=lambda _k, v, now: now + v[1])
+
+    @staticmethod
+    def _key(sid: str, key: str) -> str:
+        return f"sess:{sid}:{key}"
+
+    async def get(self, sid: str, key: str, default: Any = None) -> Any:
+        item = self._data.get(self._key(sid, key))
+        return default if item is None else item[0]
+
+    async def set(self, sid: str, key: str, value: Any, ttl: int = SESSION_TTL_SEC) -> None:
+        self._data[self._key(sid, key)] = (value, ttl)
+
+    async def delete(self, sid: str, key: str) -> None:
+        self._data.pop(self._key(sid, key), None)
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Redis-backed store for multi-worker deployments.
+    Values are JSON-serialized (orjson) under `sess:{sid}:{key}` with a TTL.
+    """
+
+    def __init__(self, url: str) -> None:
+        import redis.asyncio as redis  # optional dependency, only needed in prod
+
+        self._redis = redis.from_url(url)
+
+    async def get(self, sid: str, key: str, default: Any = None) -> Any:
+        raw = await self._redis.get(self._key(sid, key))
+        if raw is None:
+            return default
+        return orjson.loads(raw)
+
+    async def set(self, sid: str, key: str, value: Any, ttl: int = SESSION_TTL_SEC) -> None:
+        await self._redis.set(self._key(sid, key), orjson.dumps(value), ex=ttl)
+
+    async def delete(self, sid: str, key: str) -> None:
+        await self._redis.delete(self._key(sid, key))
+
+
+def from_env(url: Optional[str] = None) -> SessionStore:
+    """
+    REDIS_URL set -> RedisSessionStore, otherwise in-memory.
+    """
+    url = url or os.getenv("REDIS_URL")
+    if url:
+        return RedisSessionStore(url)
+    return SessionStore()
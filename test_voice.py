@@ -0,0 +1,97 @@
+import asyncio
+import os
+import types
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import voice
+from session_store import SessionStore
+
+
+class _FakeStream:
+    def __init__(self, deltas):
+        self._deltas = deltas
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def __aiter__(self):
+        for d in self._deltas:
+            yield types.SimpleNamespace(type="response.output_text.delta", delta=d)
+
+
+@pytest.fixture
+def stream_reply(monkeypatch):
+    store = SessionStore()
+    asyncio.run(store.set("s1", "google_tokens", {"access_token": "t"}))
+    voice.init(templates=None, store=store)
+
+    booked = []
+    decision = {"confirmed": True}
+
+    async def fake_finalize(history):
+        if not decision["confirmed"]:
+            return None
+        return {
+            "title": "T",
+            "start_iso": "2026-02-16T14:00:00-08:00",
+            "duration_min": 30,
+            "attendee_email": "a@b.com",
+            "description": "Name: Bob",
+        }
+
+    async def fake_token(sid):
+        return "t"
+
+    async def fake_create(**kw):
+        booked.append(kw)
+        return {"htmlLink": "http://cal"}
+
+    monkeypatch.setattr(voice, "_llm_decide_and_finalize", fake_finalize)
+    monkeypatch.setattr(voice, "get_valid_access_token", fake_token)
+    monkeypatch.setattr(voice, "acreate_google_calendar_event", fake_create)
+
+    app = FastAPI()
+    app.include_router(voice.router)
+    client = TestClient(app)
+    client.cookies.set("sid", "s1")
+
+    def run(deltas, confirmed=True):
+        decision["confirmed"] = confirmed
+        responses = types.SimpleNamespace(stream=lambda **kw: _FakeStream(deltas))
+        monkeypatch.setattr(voice, "client", types.SimpleNamespace(responses=responses))
+        r = client.post("/api/voice/chat/stream", json={"text": "yes"})
+        history = asyncio.run(store.get("s1", "voice_history"))
+        return r.content.decode(), booked, history
+
+    return run
+
+
+def test_split_confirmed_keyword_is_not_streamed(stream_reply):
+    body, booked, _ = stream_reply(["CON", "FIRMED"])
+    assert '"text":"CON"' not in body
+    assert "CONFIRMED" not in body
+    assert "Done! Your meeting is booked." in body
+    assert len(booked) == 1
+
+
+def test_held_prefix_is_flushed_when_not_confirmed(stream_reply):
+    body, booked, _ = stream_reply(["CON", "fused? ", "Say that again."])
+    assert '"text":"CONfused? "' in body
+    assert "creating the meeting" not in body
+    assert booked == []
+
+
+def test_unconfirmed_decision_is_not_persisted_as_confirmed(stream_reply):
+    body, booked, history = stream_reply(["CON", "FIRMED"], confirmed=False)
+    assert "creating the meeting" not in body
+    assert voice._NOT_CONFIRMED_TEXT in body
+    assert booked == []
+    assert history[-1] == {"role": "assistant", "content": voice._NOT_CONFIRMED_TEXT}
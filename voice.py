@@ -2,27 +2,54 @@
 from __future__ import annotations
 
 import os
-import io
-import json
+import logging
+import re
+import base64
+import hashlib
+import secrets
+import asyncio
+import weakref
+from collections import deque
+from contextlib import aclosing
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Deque, Dict, Optional, Iterable, Iterator, Set
 
+import httpx
+import orjson
+from cachetools import LRUCache
 from dotenv import load_dotenv
 from fastapi import APIRouter, Request, UploadFile, File
-from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
+from sse_starlette.sse import EventSourceResponse
 
-from openai import OpenAI
-from calendar_event import create_google_calendar_event
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from agent_state import is_valid_phone, normalize_phone, parse_yes_no
+from calendar_event import acreate_google_calendar_event, prewarm_google
+from oauth_google import get_valid_access_token
+from session_store import SessionStore
 
 load_dotenv(override=True)
 
+log = logging.getLogger(__name__)
+
 router = APIRouter()
 
 _templates: Optional[Jinja2Templates] = None
-_sessions: Dict[str, Dict[str, Any]] = {}
-
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+_store: SessionStore = SessionStore()
+
+# the SDK retries 429/5xx itself with exponential backoff + jitter and honors retry-after
+client = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=int(os.getenv("OAI_MAX_RETRIES", "4")),
+    # HTTP/2 lets concurrent streams share a few sockets instead of one TLS handshake each
+    http_client=DefaultAsyncHttpxClient(
+        http2=True,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    ),
+)
+# caps concurrent outbound OpenAI calls per worker (tune to the account's rate-limit tier)
+_OAI_SEM = asyncio.Semaphore(int(os.getenv("OAI_MAX_CONCURRENCY", "8")))
 
 CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4.1-nano")
 ASR_MODEL = os.getenv("ASR_MODEL", "gpt-4o-mini-transcribe")
@@ -30,36 +57,65 @@ ASR_MODEL = os.getenv("ASR_MODEL", "gpt-4o-mini-transcribe")
 TZ_NAME = os.getenv("TZ_NAME", "America/Los_Angeles")
 CALENDAR_ID = os.getenv("CALENDAR_ID", "primary")
 DEFAULT_DURATION_MIN = int(os.getenv("MEETING_DURATION_MIN", "30"))
+SSE_PING_SEC = 15
 DEFAULT_TITLE = os.getenv("DEFAULT_TITLE", "Scheduled Meeting")
 
 TTS_MODEL = os.getenv("TTS_MODEL", "gpt-4o-mini-tts")
 TTS_VOICE = os.getenv("TTS_VOICE", "alloy")
 
+HISTORY_MAX_TURNS = 20
+
 
-def init(*, templates: Jinja2Templates, sessions: Dict[str, Dict[str, Any]]):
-    global _templates, _sessions
+def init(*, templates: Jinja2Templates, store: SessionStore):
+    global _templates, _store
     _templates = templates
-    _sessions = sessions
+    _store = store
+
+
+async def startup() -> None:
+    """
+    Called once from the app lifespan: open the OpenAI connection pool so the
+    first user does not pay DNS + TLS setup (a missing OPENAI_API_KEY already
+    fails at import, when the client is built).
+    """
+    try:
+        await client.with_options(timeout=5, max_retries=0).models.list()
+    except Exception as e:
+        log.warning("OpenAI pre-warm failed: %r", e)
+    # same for the shared Google keep-alive pools
+    await prewarm_google()
 
 
 def _get_sid(req: Request) -> str:
-    sid = req.cookies.get("sid")
-    if not sid:
-        import uuid
-        sid = str(uuid.uuid4())
-    return sid
+    return req.cookies.get("sid") or secrets.token_urlsafe(16)
+
+
+async def _get_tokens(sid: str) -> Optional[Dict[str, str]]:
+    return await _store.get(sid, "google_tokens")
+
+
+# one lock per live sid; entries vanish once no request holds a reference
+_sid_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
 
 
-def _get_tokens(sid: str) -> Optional[Dict[str, str]]:
-    return _sessions.get(sid, {}).get("google_tokens")
+# strong refs to in-flight bookings, which outlive the request if the client disconnects
+_booking_tasks: "set[asyncio.Task]" = set()
 
 
-def _get_history(sid: str) -> List[dict]:
-    sess = _sessions.setdefault(sid, {})
-    print(sess)
-    if "voice_history" not in sess:
-        sess["voice_history"] = []
-    return sess["voice_history"]
+def _lock_for(sid: str) -> asyncio.Lock:
+    lock = _sid_locks.get(sid)
+    if lock is None:
+        lock = _sid_locks[sid] = asyncio.Lock()
+    return lock
+
+
+async def _get_history(sid: str) -> Deque[dict]:
+    # bounded deque: appends drop the oldest turn, no slice-and-copy trim
+    return deque(await _store.get(sid, "voice_history") or (), maxlen=HISTORY_MAX_TURNS)
+
+
+async def _save_history(sid: str, history: Iterable[dict]):
+    await _store.set(sid, "voice_history", list(history))
 
 
 SYSTEM_PROMPT = """
@@ -82,40 +138,28 @@ Rules:
 """
 
 
-DECIDE_PROMPT = """
-You are a strict decision maker.
-
-Given the full conversation, decide if the user has confirmed the meeting details.
-
-Return ONLY JSON:
-{
-  "status": "collecting" | "confirmed",
-  "reason": string
-}
-
-Rules:
-- status=confirmed only if user clearly confirmed yes/correct/that's right.
-- Otherwise collecting.
-"""
-
-
-FINALIZE_PROMPT = """
-You are an assistant that prepares Google Calendar event data.
+DECIDE_FINALIZE_PROMPT = """
+You are a strict decision maker that also prepares Google Calendar event data.
 
-Given the full conversation, extract the final meeting details.
+Given the full conversation, decide if the user has confirmed the meeting
+details and, if so, extract the final meeting details.
 
 Return ONLY JSON:
 {{
-  "title": string,
-  "start_iso": string,
-  "duration_min": integer,
-  "attendee_email": string,
-  "description": string
+  "status": "collecting" | "confirmed",
+  "event": null | {{
+    "title": string,
+    "start_iso": string,
+    "duration_min": integer,
+    "attendee_email": string,
+    "description": string
+  }}
 }}
 
-You must include "title", "start_iso", "duration_min", "attendee_email" and "description"
-
 Rules:
+- status=confirmed only if user clearly confirmed yes/correct/that's right.
+- Otherwise status=collecting and event=null.
+- When confirmed, event must include "title", "start_iso", "duration_min", "attendee_email" and "description".
 - start_iso must be ISO8601 with timezone offset, example:
   2026-02-16T14:00:00-08:00
 - Timezone: {tz_name}
@@ -127,47 +171,238 @@ Rules:
 """
 
 
+# built once: prompts, schema and system messages are constant per process
+_EVENT_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {
+        "title": {"type": "string"},
+        "start_iso": {"type": "string"},
+        "duration_min": {"type": "integer"},
+        "attendee_email": {"type": "string"},
+        "description": {"type": "string"},
+    },
+    "required": ["title", "start_iso", "duration_min", "attendee_email", "description"],
+}
+# decision + extraction in one call: one round-trip and one prefill of the history
+_DECIDE_FINALIZE_SCHEMA = {
+    "type": "object",
+    "additionalProperties": False,
+    "properties": {
+        "status": {"type": "string", "enum": ["collecting", "confirmed"]},
+        "event": {"anyOf": [_EVENT_SCHEMA, {"type": "null"}]},
+    },
+    "required": ["status", "event"],
+}
+_DECIDE_FINALIZE_TEXT_FORMAT = {
+    "format": {"type": "json_schema", "name": "decide_finalize", "schema": _DECIDE_FINALIZE_SCHEMA},
+}
 
-def _llm_finalize_event(history: List[dict]) -> dict:
-    schema = {
-        "type": "object",
-        "additionalProperties": False,
-        "properties": {
-            "title": {"type": "string"},
-            "start_iso": {"type": "string"},
-            "duration_min": {"type": "integer"},
-            "attendee_email": {"type": "string"},
-            "description": {"type": "string"},
-        },
-        "required": ["title", "start_iso", "duration_min", "attendee_email", "description"],
+_DECIDE_FINALIZE_SYSTEM = {"role": "system", "content": DECIDE_FINALIZE_PROMPT.format(
+    tz_name=TZ_NAME,
+    duration_min=DEFAULT_DURATION_MIN,
+    default_title=DEFAULT_TITLE,
+)}
+_ASSISTANT_SYSTEM = {"role": "system", "content": SYSTEM_PROMPT}
+
+
+async def _llm_decide_and_finalize(history: Iterable[dict]) -> Optional[dict]:
+    """
+    Returns the event fields, or None when the model judges the user has
+    not actually confirmed yet.
+    """
+    async with _OAI_SEM:
+        r = await client.responses.create(
+            model=CHAT_MODEL,
+            input=[_DECIDE_FINALIZE_SYSTEM, *history],
+            text=_DECIDE_FINALIZE_TEXT_FORMAT,
+        )
+    out = orjson.loads(r.output_text)
+    if out.get("status") != "confirmed":
+        return None
+    return out.get("event")
+
+
+# -------------------------
+# regex fast path for finalize (skips one LLM round-trip when the details are explicit)
+# -------------------------
+_FAST_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_FAST_ISO_RE = re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2})?(?:Z|[+-]\d{2}:\d{2})?")
+_FAST_PHONE_RE = re.compile(r"\+?\d[\d\s\-().]{6,}\d")
+# a digit run only counts as the phone when the user says so, or sends nothing else
+_FAST_PHONE_HINT_RE = re.compile(r"(?i)\b(?:phone|number|cell|mobile)\b")
+_FAST_NAME_RE = re.compile(r"\b(?i:my name is|my name's)\s+([A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)?)")
+# anything that may carry a custom title or duration still needs the LLM
+_FAST_BAIL_RE = re.compile(r"(?i)\b(?:title|call it|called|minutes?|hours?|mins?)\b")
+
+
+def _fast_phones(text: str) -> Set[str]:
+    # dates and emails contain digit runs too; blank them out first
+    rest = _FAST_EMAIL_RE.sub(" ", _FAST_ISO_RE.sub(" ", text))
+    found = {normalize_phone(m.group(0)) for m in _FAST_PHONE_RE.finditer(rest)}
+    found = {p for p in found if is_valid_phone(p)}
+    if found and (_FAST_PHONE_HINT_RE.search(text) or _FAST_PHONE_RE.fullmatch(rest.strip(" .!"))):
+        return found
+    return set()
+
+
+def _fast_finalize(history: Iterable[dict]) -> Optional[dict]:
+    """
+    Pull the event fields from the user's own messages with regexes.
+    Returns None (caller falls back to the LLM) unless the last user
+    message is a plain yes and exactly one email, start time, phone and
+    name were found.
+    """
+    user_texts = [m.get("content") or "" for m in history if m.get("role") == "user"]
+    if not user_texts or parse_yes_no(user_texts[-1].strip().rstrip(".!")) is not True:
+        return None
+
+    emails, starts, phones, names = set(), set(), set(), set()
+    for text in user_texts:
+        if _FAST_BAIL_RE.search(text):
+            return None
+        emails.update(m.group(0).lower() for m in _FAST_EMAIL_RE.finditer(text))
+        starts.update(m.group(0).replace(" ", "T") for m in _FAST_ISO_RE.finditer(text))
+        phones |= _fast_phones(text)
+        names.update(m.group(1) for m in _FAST_NAME_RE.finditer(text))
+
+    # missing or ambiguous (e.g. the user corrected a field) -> let the LLM decide
+    if not all(len(found) == 1 for found in (emails, starts, phones, names)):
+        return None
+    (email,), (start_iso,), (phone,), (name,) = emails, starts, phones, names
+    return {
+        "title": DEFAULT_TITLE,
+        "start_iso": start_iso,
+        "duration_min": DEFAULT_DURATION_MIN,
+        "attendee_email": email,
+        "description": f"Name: {name}\nPhone: {phone}",
     }
-    r = client.responses.create(
-        model=CHAT_MODEL,
-        input=[
-            {"role": "system", "content": FINALIZE_PROMPT.format(
-                tz_name=TZ_NAME,
-                duration_min=DEFAULT_DURATION_MIN,
-                default_title=DEFAULT_TITLE,
-            )},
-            *history,
-        ],
-        text={"format": {"type": "json_schema", "name": "finalize", "schema": schema}},
-    )
-    return json.loads(r.output_text)
-
-
-def _stream_assistant(history: List[dict]):
-    with client.responses.stream(
-        model=CHAT_MODEL,
-        input=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            *history,
-        ],
-    ) as stream:
-        for event in stream:
-            if event.type == "response.output_text.delta":
-                if event.delta:
-                    yield event.delta
+
+
+async def _stream_assistant(history: Iterable[dict]):
+    async with _OAI_SEM:
+        async with client.responses.stream(
+            model=CHAT_MODEL,
+            input=[_ASSISTANT_SYSTEM, *history],
+        ) as stream:
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    if event.delta:
+                        yield event.delta
+
+
+# -------------------------
+# SSE frames (bytes); only the text value is JSON-encoded per frame, via orjson
+# -------------------------
+_DELTA_PREFIX = b'data: {"type":"delta","text":'
+_SUFFIX = b"}\n\n"
+_DONE_FRAME = b'data: {"type":"done"}\n\n'
+
+
+def _delta_frame(text: str) -> bytes:
+    return _DELTA_PREFIX + orjson.dumps(text) + _SUFFIX
+
+
+def _static_reply(text: str) -> bytes:
+    return _delta_frame(text) + _DONE_FRAME
+
+
+def _audio_frame(mp3: bytes) -> bytes:
+    return b'data: {"type":"audio","b64":"' + base64.b64encode(mp3) + b'"}\n\n'
+
+
+_NO_AUDIO_FRAME = _static_reply("I didn’t catch that. Can you say it again?")
+_OAUTH_WARN_FRAME = _static_reply("⚠️ Google Calendar is not connected. Please open /auth/google first.")
+_CONFIRMED = "CONFIRMED"
+_CREATING_TEXT = "One second — I'm creating the meeting details for you now."
+_CREATING_FRAME = _delta_frame(_CREATING_TEXT)
+_CREATE_FAILED_TEXT = "\n\n⚠️ Failed to create calendar event. Please try again in a moment."
+_NOT_CONFIRMED_TEXT = "Actually, I still need you to confirm the details. Is everything correct? (yes/no)"
+
+
+# -------------------------
+# inline TTS: synthesize each sentence while the rest of the reply streams
+# -------------------------
+_SENTENCE_END_RE = re.compile(r"[.!?](?:\s|$)")
+
+
+# content-addressed MP3 cache: repeated prompts/fallbacks skip the TTS call entirely.
+# Only short texts are cached (full replies are almost never repeated), and the
+# cache is bounded by total MP3 bytes rather than entry count.
+TTS_CACHE_MAX_CHARS = 80
+TTS_CACHE_BYTES = 8 * 1024 * 1024
+_tts_cache: LRUCache = LRUCache(maxsize=TTS_CACHE_BYTES, getsizeof=len)
+
+
+def _tts_key(text: str) -> Optional[bytes]:
+    if len(text) > TTS_CACHE_MAX_CHARS:
+        return None
+    return hashlib.blake2b(f"{TTS_MODEL}|{TTS_VOICE}|{text}".encode(), digest_size=16).digest()
+
+
+async def _synthesize(text: str) -> bytes:
+    key = _tts_key(text)
+    mp3 = _tts_cache.get(key) if key else None
+    if mp3 is not None:
+        return mp3
+    async with _OAI_SEM:
+        async with client.audio.speech.with_streaming_response.create(
+            model=TTS_MODEL,
+            voice=TTS_VOICE,
+            input=text,
+            response_format="mp3",
+        ) as resp:
+            mp3 = await resp.read()
+    if key:
+        _tts_cache[key] = mp3
+    return mp3
+
+
+class _SentenceTTS:
+    """
+    Starts a TTS task for every complete sentence fed in, so the first
+    audio is ready while later text is still generating. Audio frames
+    are handed back in sentence order.
+    """
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._tasks: Deque[asyncio.Task] = deque()
+
+    def feed(self, text: str) -> None:
+        self._buf += text
+        end = None
+        for m in _SENTENCE_END_RE.finditer(self._buf):
+            end = m.end()
+        if end is not None:
+            self._start(self._buf[:end])
+            self._buf = self._buf[end:]
+
+    def _start(self, text: str) -> None:
+        text = text.strip()
+        if text:
+            self._tasks.append(asyncio.create_task(_synthesize(text)))
+
+    def ready(self) -> Iterator[bytes]:
+        # non-blocking: only sentences whose audio has already finished
+        while self._tasks and self._tasks[0].done():
+            task = self._tasks.popleft()
+            if task.exception() is None:
+                yield _audio_frame(task.result())
+
+    async def drain(self):
+        self._start(self._buf)
+        self._buf = ""
+        while self._tasks:
+            try:
+                mp3 = await self._tasks.popleft()
+            except Exception:
+                continue  # skip a failed sentence rather than abort the reply
+            yield _audio_frame(mp3)
+
+    def cancel(self) -> None:
+        for task in self._tasks:
+            task.cancel()
 
 
 @router.get("/voice", response_class=HTMLResponse)
@@ -178,14 +413,12 @@ def voice_page(request: Request):
 
 @router.post("/api/asr")
 async def api_asr(audio: UploadFile = File(...)):
-    data = await audio.read()
-    f = io.BytesIO(data)
-    f.name = audio.filename or "audio.webm"
-
-    r = client.audio.transcriptions.create(
-        model=ASR_MODEL,
-        file=f,
-    )
+    # hand the upload's spooled temp file straight to the SDK: no extra in-memory copy
+    async with _OAI_SEM:
+        r = await client.audio.transcriptions.create(
+            model=ASR_MODEL,
+            file=(audio.filename or "audio.webm", audio.file, audio.content_type or "audio/webm"),
+        )
     return {"text": (r.text or "").strip()}
 
 
@@ -198,86 +431,147 @@ async def voice_chat_stream(request: Request):
     else:
         user_text = (payload.get("text") or "").strip()
 
-    if not user_text:
-        def one():
-            msg = "I didn’t catch that. Can you say it again?"
-            yield f"data: {json.dumps({'type': 'delta', 'text': msg})}\n\n"
-            yield f"data: {json.dumps({'type': 'final_text', 'text': msg})}\n\n"
-            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+    # opt-in: client plays "audio" frames instead of calling /api/tts/stream afterwards
+    inline_tts = bool(payload.get("tts"))
 
-        return StreamingResponse(one(), media_type="text/event-stream")
+    if not user_text:
+        return Response(_NO_AUDIO_FRAME, media_type="text/event-stream")
     sid = _get_sid(request)
-    history = _get_history(sid)
-
-    # save user message
-    history.append({"role": "user", "content": user_text})
-    history[:] = history[-20:]
-    tokens = _get_tokens(sid)
+    # save user message (read-modify-write under the sid lock so concurrent turns don't drop messages)
+    async with _lock_for(sid):
+        history = await _get_history(sid)
+        history.append({"role": "user", "content": user_text})
+        await _save_history(sid, history)
+    tokens = await _get_tokens(sid)
     if not tokens:
-        def one():
-            msg = "⚠️ Google Calendar is not connected. Please open /auth/google first."
-            yield f"data: {json.dumps({'type':'delta','text':msg})}\n\n"
-            yield f"data: {json.dumps({'type':'final_text','text':msg})}\n\n"
-            yield f"data: {json.dumps({'type':'done'})}\n\n"
-        resp = StreamingResponse(one(), media_type="text/event-stream")
+        resp = Response(_OAUTH_WARN_FRAME, media_type="text/event-stream")
         resp.set_cookie("sid", sid, httponly=True, samesite="lax")
         return resp
-    def sse():
-        assistant_text = ""
-
-        # stream assistant normal reply
-        for chunk in _stream_assistant(history):
-            assistant_text += chunk
-            yield f"data: {json.dumps({'type':'delta','text':chunk})}\n\n"
-
-        # store assistant reply
-        history.append({"role": "assistant", "content": assistant_text})
-        history[:] = history[-20:]
-
-        # if assistant said CONFIRMED -> create event
-        if "CONFIRMED" in assistant_text:
-            fixed = "One second — I'm creating the meeting details for you now."
-            yield f"data: {json.dumps({'type':'delta','text':fixed})}\n\n"
-
+    async def sse():
+        tts = _SentenceTTS() if inline_tts else None
+
+        def say(text: str) -> bytes:
+            if tts:
+                tts.feed(text)
+            return _delta_frame(text)
+
+        async def _book(event_data: dict) -> str:
+            start_dt = datetime.fromisoformat(event_data["start_iso"])
+            end_dt = start_dt + timedelta(minutes=int(event_data["duration_min"]))
+
+            access_token = await get_valid_access_token(sid)
+            created = await acreate_google_calendar_event(
+                access_token=access_token,
+                calendar_id=CALENDAR_ID,
+                title=event_data["title"],
+                start_dt=start_dt,
+                end_dt=end_dt,
+                tz_name=TZ_NAME,
+                attendee_email=event_data["attendee_email"],
+                description=event_data["description"],
+            )
+
+            # reset history after booking (inside the shielded task, so a disconnect can't skip it)
+            async with _lock_for(sid):
+                await _save_history(sid, [])
+
+            meet_link = created.get("hangoutLink")
+            html_link = created.get("htmlLink")
+
+            extra = "\n\n✅ Done! Your meeting is booked."
+            if meet_link:
+                extra += f"\nMeet link: {meet_link}"
+            if html_link:
+                extra += f"\nCalendar link: {html_link}"
+            extra += f"\nInvite sent to: {event_data['attendee_email']}"
+            return extra
+
+        async def _book_logged(event_data: dict) -> str:
             try:
-                event_data = _llm_finalize_event(history)
-                start_dt = datetime.fromisoformat(event_data["start_iso"])
-                end_dt = start_dt + timedelta(minutes=int(event_data["duration_min"]))
-
-                created = create_google_calendar_event(
-                    access_token=tokens["access_token"],
-                    calendar_id=CALENDAR_ID,
-                    title=event_data["title"],
-                    start_dt=start_dt,
-                    end_dt=end_dt,
-                    tz_name=TZ_NAME,
-                    attendee_email=event_data["attendee_email"],
-                    description=event_data["description"],
-                )
-
-                meet_link = created.get("hangoutLink")
-                html_link = created.get("htmlLink")
-
-                extra = "\n\n✅ Done! Your meeting is booked."
-                if meet_link:
-                    extra += f"\nMeet link: {meet_link}"
-                if html_link:
-                    extra += f"\nCalendar link: {html_link}"
-                extra += f"\nInvite sent to: {event_data['attendee_email']}"
-
-                yield f"data: {json.dumps({'type':'delta','text':extra})}\n\n"
-
-                # reset history after booking
-                _sessions[sid]["voice_history"] = []
-
-            except Exception as e:
-                err = f"\n\n⚠️ Failed to create calendar event: {e}"
-                yield f"data: {json.dumps({'type':'delta','text':err})}\n\n"
-
-        yield f"data: {json.dumps({'type':'final_text','text': assistant_text})}\n\n"
-        yield f"data: {json.dumps({'type':'done'})}\n\n"
-
-    resp = StreamingResponse(sse(), media_type="text/event-stream")
+                return await _book(event_data)
+            except Exception:
+                # details go to the log only; the client gets a generic message
+                log.exception("calendar create failed sid=%s", sid)
+                return _CREATE_FAILED_TEXT
+
+        try:
+            assistant_text = ""
+            # deltas that could still spell out CONFIRMED are held back until they can't
+            held = ""
+            confirmed = False
+
+            # stream assistant normal reply; aclosing() shuts the HTTP stream and
+            # releases the semaphore as soon as we break out early
+            async with aclosing(_stream_assistant(history)) as chunks:
+                async for chunk in chunks:
+                    assistant_text += chunk
+                    head = assistant_text.lstrip()
+                    if head.startswith(_CONFIRMED):
+                        confirmed = True
+                        break
+                    if _CONFIRMED.startswith(head):
+                        held += chunk
+                        continue
+                    yield say(held + chunk)
+                    held = ""
+                    if tts:
+                        for frame in tts.ready():
+                            yield frame
+            if held and not confirmed:
+                yield say(held)
+            # a model that wraps the keyword in other text still confirms
+            confirmed = confirmed or _CONFIRMED in assistant_text
+
+            event_data = None
+            if confirmed:
+                # the user only really confirmed if decide+finalize agrees; nothing
+                # is shown or persisted as CONFIRMED before that
+                try:
+                    event_data = _fast_finalize(history) or await _llm_decide_and_finalize(history)
+                except Exception:
+                    log.exception("finalize failed sid=%s", sid)
+                    yield say(_CREATE_FAILED_TEXT)
+                    confirmed = False
+                    assistant_text = _CONFIRMED  # keep it so the next "yes" retries
+                else:
+                    if not event_data:
+                        yield say(_NOT_CONFIRMED_TEXT)
+                        confirmed = False
+                        assistant_text = _NOT_CONFIRMED_TEXT
+
+            # store assistant reply on top of whatever is persisted now
+            history.append({"role": "assistant", "content": _CONFIRMED if confirmed else assistant_text})
+            async with _lock_for(sid):
+                stored = await _get_history(sid)
+                stored.append(history[-1])
+                await _save_history(sid, stored)
+
+            # confirmed and finalized -> create event
+            if confirmed:
+                # the calendar insert runs while the status line is sent/spoken
+                task = asyncio.create_task(_book_logged(event_data))
+                _booking_tasks.add(task)
+                task.add_done_callback(_booking_tasks.discard)
+                if tts:
+                    tts.feed(_CREATING_TEXT)
+                yield _CREATING_FRAME
+
+                # shield: a client disconnect cancels this generator, not the booking
+                yield say(await asyncio.shield(task))
+
+            if tts:
+                async for frame in tts.drain():
+                    yield frame
+
+            # no final_text echo: the client already concatenates the deltas
+            yield _DONE_FRAME
+        finally:
+            if tts:
+                tts.cancel()
+
+    # frames are pre-encoded bytes (passed through as-is); the response adds
+    # keep-alive pings and the no-buffering / no-cache headers for proxies
+    resp = EventSourceResponse(sse(), ping=SSE_PING_SEC, sep="\n")
     resp.set_cookie("sid", sid, httponly=True, samesite="lax")
     return resp
 
@@ -289,15 +583,28 @@ async def tts_stream(request: Request):
     if not text:
         return JSONResponse({"error": "missing text"}, status_code=400)
 
-    def audio_iter():
-        with client.audio.speech.with_streaming_response.create(
-            model=TTS_MODEL,
-            voice=TTS_VOICE,
-            input=text,
-            response_format="mp3",
-        ) as resp:
-            for chunk in resp.iter_bytes(chunk_size=8192):
-                if chunk:
+    key = _tts_key(text)
+    cached = _tts_cache.get(key) if key else None
+    if cached is not None:
+        return Response(cached, media_type="audio/mpeg")
+
+    async def audio_iter():
+        buf = bytearray()
+        async with _OAI_SEM:
+            async with client.audio.speech.with_streaming_response.create(
+                model=TTS_MODEL,
+                voice=TTS_VOICE,
+                input=text,
+                response_format="mp3",
+            ) as resp:
+                # no chunk_size: pass network reads through as-is (never empty) instead of
+                # re-slicing them into 8 KiB pieces or holding audio back to fill a buffer
+                async for chunk in resp.iter_bytes():
+                    if key:
+                        buf += chunk
                     yield chunk
+        # only reached when the whole clip streamed (a disconnect never caches a partial)
+        if key:
+            _tts_cache[key] = bytes(buf)
 
     return StreamingResponse(audio_iter(), media_type="audio/mpeg")
\ No newline at end of file